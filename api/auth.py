@@ -1,4 +1,8 @@
-from jose import jwt, JWTError
+import hashlib
+import time
+import jwt
+from collections import OrderedDict
+from jwt import InvalidTokenError
 from datetime import datetime, timedelta
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
@@ -6,6 +10,42 @@ from scripts.config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, R
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
+
+class TokenCache:
+    """Cache LRU de tokens já validados: evita refazer o decode/HMAC a cada request"""
+
+    def __init__(self, maxsize: int = 10_000, leeway: int = 5):
+        self.maxsize = maxsize
+        self.leeway = leeway
+        self._entries = OrderedDict()
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+    def get(self, token: str) -> str | None:
+        key = self._key(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        username, exp_ts = entry
+        if time.time() >= exp_ts - self.leeway:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return username
+
+    def set(self, token: str, username: str, exp_ts: float):
+        key = self._key(token)
+        self._entries[key] = (username, exp_ts)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+
+token_cache = TokenCache()
+
+
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=15))
@@ -19,11 +59,16 @@ def create_refresh_token(data: dict):
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 async def get_current_user(token: str = Depends(oauth2_scheme)):
+    username = token_cache.get(token)
+    if username is not None:
+        return username
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
         if username is None:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
-    except JWTError:
+    except InvalidTokenError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+    if "exp" in payload:
+        token_cache.set(token, username, payload["exp"])
     return username
@@ -0,0 +1,97 @@
+import os
+import time
+from functools import wraps
+from threading import Lock
+from typing import Any, Optional
+
+import orjson
+
+
+def ttl_cache(ttl: float):
+    """Cacheia o último resultado de uma função sem argumentos por `ttl` segundos"""
+
+    def decorator(func):
+        state = {"expires_at": 0.0, "value": None}
+        lock = Lock()
+
+        @wraps(func)
+        def wrapper():
+            with lock:
+                now = time.monotonic()
+                if now >= state["expires_at"]:
+                    state["value"] = func()
+                    state["expires_at"] = now + ttl
+                return state["value"]
+
+        return wrapper
+
+    return decorator
+
+
+# Redis é opcional: sem a lib ou sem REDIS_URL o cache do catálogo fica desligado
+try:
+    import redis
+    import redis.asyncio as aioredis
+except ImportError:
+    redis = None
+
+REDIS_URL = os.getenv("REDIS_URL")
+CATALOG_CACHE_TTL = 300
+CATALOG_KEYS = ("books:all", "books:categories", "stats:overview", "stats:categories")
+
+
+class CatalogCache:
+    """Cache look-aside (Redis) das respostas de leitura do catálogo de livros"""
+
+    def __init__(self, url: Optional[str] = None, ttl: int = CATALOG_CACHE_TTL):
+        self.ttl = ttl
+        # Versão do catálogo neste processo; incrementada a cada invalidate
+        self.version = 0
+        self._memo = {}
+        self.enabled = bool(url) and redis is not None
+        if self.enabled:
+            self._client = aioredis.from_url(url)
+            self._sync_client = redis.Redis.from_url(url)
+
+    def memo_get(self, key: str) -> Any:
+        """Valor memoizado em processo, se gravado na versão atual do catálogo e ainda no TTL"""
+        version, expires_at, value = self._memo.get(key, (None, 0.0, None))
+        if version != self.version or time.monotonic() >= expires_at:
+            return None
+        return value
+
+    def memo_set(self, key: str, value: Any, version: int):
+        # Mesmo TTL das chaves no Redis: a versão só muda no processo que fez o scraping,
+        # então os demais workers dependem da expiração para enxergar o catálogo novo
+        self._memo[key] = (version, time.monotonic() + self.ttl, value)
+
+    async def get(self, key: str) -> Any:
+        if not self.enabled:
+            return None
+        try:
+            cached = await self._client.get(key)
+        except redis.RedisError:
+            return None
+        return orjson.loads(cached) if cached is not None else None
+
+    async def set(self, key: str, value: Any, version: int):
+        """Grava no Redis, exceto se o catálogo mudou desde `version` (lida antes da consulta)"""
+        if not self.enabled or version != self.version:
+            return
+        try:
+            await self._client.setex(key, self.ttl, orjson.dumps(value))
+        except redis.RedisError:
+            pass
+
+    def invalidate(self):
+        """Descarta as respostas cacheadas (chamado pela thread de scraping)"""
+        self.version += 1
+        if not self.enabled:
+            return
+        try:
+            self._sync_client.delete(*CATALOG_KEYS)
+        except redis.RedisError:
+            pass
+
+
+catalog_cache = CatalogCache(REDIS_URL)
@@ -1,20 +1,105 @@
 import streamlit as st
 import requests
 import pandas as pd
-import altair as alt
 
 API_URL = "https://techchalangerapi.onrender.com/api/v1/monitoring/dashboard"
 
+# Specs Vega-Lite montadas uma única vez no import (evita o custo do Altair a cada rerun)
+REQUESTS_SPEC = {
+    "mark": {"type": "line", "point": True},
+    "encoding": {
+        "x": {"field": "timestamp", "type": "temporal"},
+        "y": {"field": "requests_count", "type": "quantitative"},
+        "tooltip": [
+            {"field": "timestamp", "type": "temporal"},
+            {"field": "requests_count", "type": "quantitative"},
+        ],
+    },
+    "height": 300,
+}
+
+RESPONSE_TIMES_SPEC = {
+    "mark": {"type": "line", "point": True},
+    "encoding": {
+        "x": {"field": "timestamp", "type": "temporal"},
+        "y": {"field": "tempo", "type": "quantitative"},
+        "color": {"field": "percentil", "type": "nominal"},
+        "tooltip": [
+            {"field": "timestamp", "type": "temporal"},
+            {"field": "percentil", "type": "nominal"},
+            {"field": "tempo", "type": "quantitative"},
+        ],
+    },
+    "height": 300,
+}
+
+SYSTEM_SPEC = {
+    "mark": {"type": "bar", "size": 10},
+    "encoding": {
+        "x": {"field": "tempo_metrica", "type": "nominal", "title": None, "axis": None},
+        "y": {"field": "percentual", "type": "quantitative", "title": "Uso (%)"},
+        "color": {"field": "métrica", "type": "nominal", "title": "Métrica"},
+        "tooltip": [
+            {"field": "timestamp", "type": "temporal"},
+            {"field": "métrica", "type": "nominal"},
+            {"field": "percentual", "type": "quantitative"},
+        ],
+    },
+    "height": 300,
+}
+
+
+@st.cache_data(ttl=30)
+def fetch_dashboard():
+    """Busca os dados da API (cacheado por 30s entre reruns)"""
+    response = requests.get(API_URL, timeout=5)
+    return response.json()
+
+
+# Poucas entradas: cada refetch traz um payload novo (timestamp do sistema muda sempre)
+@st.cache_data(ttl=30, max_entries=4)
+def build_frames(historical_data):
+    """Monta os DataFrames dos gráficos a partir do histórico da API"""
+    requests_df = pd.DataFrame(historical_data["http_requests_timeline"])
+    requests_df["timestamp"] = pd.to_datetime(requests_df["timestamp"])
+
+    # set_index + stack no lugar de melt: evita replicar o id_vars por coluna
+    response_df = pd.DataFrame(historical_data["response_times_timeline"])
+    response_df["timestamp"] = pd.to_datetime(response_df["timestamp"])
+    response_df = (
+        response_df.set_index("timestamp")
+        .stack()
+        .rename_axis(["timestamp", "percentil"])
+        .reset_index(name="tempo")
+    )
+
+    sys_df = pd.DataFrame(historical_data["system_metrics_timeline"])
+    sys_df["timestamp"] = pd.to_datetime(sys_df["timestamp"])
+    sys_df = (
+        sys_df.set_index("timestamp")
+        .stack()
+        .rename_axis(["timestamp", "métrica"])
+        .reset_index(name="percentual")
+    )
+    sys_df["tempo_metrica"] = sys_df["timestamp"].dt.strftime("%H:%M") + " - " + sys_df["métrica"]
+
+    return requests_df, response_df, sys_df
+
+
 st.set_page_config(page_title="Dashboard de Monitoramento", layout="wide")
 st.title("📊 Dashboard de Monitoramento")
 
+if st.sidebar.button("🔄 Atualizar"):
+    fetch_dashboard.clear()
+
 try:
-    response = requests.get(API_URL)
-    data = response.json()
+    data = fetch_dashboard()
 except Exception as e:
     st.error(f"Erro ao conectar com a API: {e}")
     st.stop()
 
+requests_df, response_df, sys_df = build_frames(data["historical_data"])
+
 st.subheader("🔹 Métricas Atuais")
 metrics = data["current_metrics"]
 
@@ -33,50 +118,17 @@ st.caption(f"📅 Última atualização: {metrics['current_timestamp']}")
 st.caption(f"Fonte de dados: {metrics['data_source']}")
 
 st.subheader("📈 Requisições por Hora")
-requests_df = pd.DataFrame(data["historical_data"]["http_requests_timeline"])
-requests_df["timestamp"] = pd.to_datetime(requests_df["timestamp"])
-
-chart = alt.Chart(requests_df).mark_line(point=True).encode(
-    x="timestamp:T",
-    y="requests_count:Q",
-    tooltip=["timestamp", "requests_count"]
-).properties(height=300)
-
-st.altair_chart(chart, use_container_width=True)
+st.vega_lite_chart(requests_df, REQUESTS_SPEC, use_container_width=True)
 
 st.subheader("⏱️ Tempos de Resposta (p50, p95, p99)")
-response_df = pd.DataFrame(data["historical_data"]["response_times_timeline"])
-response_df["timestamp"] = pd.to_datetime(response_df["timestamp"])
-response_df = response_df.melt(id_vars=["timestamp"], var_name="percentil", value_name="tempo")
-
-chart2 = alt.Chart(response_df).mark_line(point=True).encode(
-    x="timestamp:T",
-    y="tempo:Q",
-    color="percentil:N",
-    tooltip=["timestamp", "percentil", "tempo"]
-).properties(height=300)
-
-st.altair_chart(chart2, use_container_width=True)
+st.vega_lite_chart(response_df, RESPONSE_TIMES_SPEC, use_container_width=True)
 
 st.subheader("🖥️ Uso de Sistema")
-sys_df = pd.DataFrame(data["historical_data"]["system_metrics_timeline"])
-sys_df["timestamp"] = pd.to_datetime(sys_df["timestamp"])
-sys_df = sys_df.melt(id_vars=["timestamp"], var_name="métrica", value_name="percentual")
-
-sys_df["tempo_metrica"] = sys_df["timestamp"].dt.strftime("%H:%M") + " - " + sys_df["métrica"]
-
-chart3 = alt.Chart(sys_df).mark_bar(size=10).encode(
-    x=alt.X("tempo_metrica:N", title=None, axis=None),
-    y=alt.Y("percentual:Q", title="Uso (%)"),
-    color=alt.Color("métrica:N", title="Métrica"),
-    tooltip=["timestamp", "métrica", "percentual"]
-).properties(height=300)
-
-st.altair_chart(chart3, use_container_width=True)
+st.vega_lite_chart(sys_df, SYSTEM_SPEC, use_container_width=True)
 
 st.subheader("⚠️ Eventos de Erro")
 errors = data["historical_data"]["error_events"]
 if errors:
     st.write(pd.DataFrame(errors))
 else:
-    st.info("Nenhum evento de erro registrado nas últimas 24h.")
\ No newline at end of file
+    st.info("Nenhum evento de erro registrado nas últimas 24h.")
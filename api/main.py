@@ -1,19 +1,29 @@
+import io
+import os
+import re
+import tempfile
 import time
 from fastapi import FastAPI, Depends, HTTPException, Query, Path, status, Body, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
+from prometheus_client import CONTENT_TYPE_LATEST
 from .auth import create_access_token, create_refresh_token, get_current_user
-from pydantic import BaseModel, field_validator
+from .cache import catalog_cache, ttl_cache
+from pydantic import BaseModel
 from typing import List, Dict, Any
-from threading import Thread
-from sqlalchemy import func
-from sqlalchemy.orm import Session
-from jose import jwt, JWTError
+from threading import RLock
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from sqlalchemy import Float, Numeric, cast, delete, func, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+import jwt
+from jwt import InvalidTokenError
 from datetime import datetime, timedelta
 
-from scripts.scrapping import save_to_csv, scrape_all_books_with_progress
+from scripts.scrapping import iter_books_with_progress, save_to_csv
 
-from database.database import Base, engine
-from models.models import Book as BookModel
+from database.database import Base, engine, SessionLocal, AsyncSessionLocal
+from models.models import RATING_ORDER, Book as BookModel, upgrade_books_schema
 from database.dependencies import get_db
 from .users import users
 from scripts.config import ACCESS_TOKEN_EXPIRE_MINUTES, SECRET_KEY, ALGORITHM
@@ -24,13 +34,14 @@ from monitoring import (
     structured_logger,
     metrics,
     exporter,
+    system_sampler,
 )
 
 
-import csv
-import random
 import pickle
 import numpy as np
+import orjson
+import pandas as pd
 
 scraping_status = {
     "is_running": False,
@@ -39,15 +50,19 @@ scraping_status = {
     "start_time": None,
     "estimated_completion": None
 }
+# Protege o scraping_status, alterado pela thread de scraping e lido pelos requests
+_status_lock = RLock()
 
 
 Base.metadata.create_all(bind=engine)
+upgrade_books_schema(engine)
 
 
 app = FastAPI(
     title="Webscraping Project",
     version="1.0.0",
     description="Projeto do Tech Challenge...",
+    default_response_class=ORJSONResponse,
 )
 
 books_result = []
@@ -63,18 +78,78 @@ class BookSchema(BaseModel):
     image_url: str
     target: int
 
-    @field_validator("price")
-    def format_price(cls, v):
-        return round(v, 2)
-
     model_config = {"from_attributes": True}
 
 
-rating_order = {"One": 1, "Two": 2, "Three": 3, "Four": 4, "Five": 5}
+rating_order = RATING_ORDER
+BOOK_COLUMNS = ["title", "price", "rating", "availability", "category", "image_url"]
+# Remove tudo que não é dígito ASCII ou ponto do preço raspado (ex.: "Â£51.77")
+_PRICE_RE = re.compile(r"[^0-9.]")
+
+# Preço arredondado no banco (antes um field_validator por linha no BookSchema).
+# O cast para Numeric é exigido pelo round(x, n) do PostgreSQL; volta a Float
+# para não chegar como Decimal no orjson
+rounded_price = cast(func.round(cast(BookModel.price, Numeric), 2), Float).label("price")
+
+# Projeções Core: as rotas de leitura recebem linhas, sem instanciar objetos ORM
+book_select = select(
+    BookModel.id,
+    BookModel.title,
+    rounded_price,
+    BookModel.rating,
+    BookModel.availability,
+    BookModel.category,
+    BookModel.image_url,
+    BookModel.target,
+)
+ml_select = select(
+    BookModel.price,
+    BookModel.rating_num,
+    BookModel.category,
+    BookModel.availability,
+    BookModel.target,
+)
 
 app.add_middleware(RequestMonitoringMiddleware)
 
 
+async def load_books(db: AsyncSession, *criteria, order_by=()) -> List[Dict[str, Any]]:
+    """Executa o book_select com filtros/ordenação e devolve os livros como dicionários"""
+    # Ponto único de leitura do catálogo: dados relacionados que surgirem no modelo
+    # devem entrar aqui como projeção/consulta em lote, nunca por livro
+    query = book_select.where(*criteria).order_by(*order_by)
+    result = await db.execute(query)
+    return [dict(book) for book in result.mappings()]
+
+
+@app.on_event("startup")
+def start_scrape_worker():
+    # Um único worker: o scraping é serializado e roda fora do event loop
+    app.state.scrape_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="scrape")
+
+
+@app.on_event("shutdown")
+def stop_scrape_worker():
+    app.state.scrape_executor.shutdown(wait=False, cancel_futures=True)
+
+
+@app.on_event("startup")
+def start_system_sampler():
+    # CPU/memória/disco amostrados em background; a dashboard só lê o snapshot
+    system_sampler.start()
+
+
+@app.on_event("shutdown")
+def stop_system_sampler():
+    system_sampler.stop()
+
+
+@app.on_event("shutdown")
+def flush_logs():
+    # Os sinks do loguru escrevem em background; garante que nada fica na fila
+    structured_logger.complete()
+
+
 @app.post("/api/v1/auth/login", tags=["Authentication"])
 async def login(form_data: OAuth2PasswordRequestForm = Depends()):
     username = form_data.username
@@ -116,7 +191,7 @@ async def refresh_token(refresh_token: str = Body(...)):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token"
             )
-    except JWTError:
+    except InvalidTokenError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token"
         )
@@ -133,102 +208,139 @@ async def refresh_token(refresh_token: str = Body(...)):
 # ---------------------- Scrape Books ----------------------
 # ----------------------------------------------------------
 @app.get("/api/v1/scrape", tags=["Completed"])
-def scrape_books(
-    db: Session = Depends(get_db), username: str = Depends(get_current_user)
-):
-    global scraping_status
+async def scrape_books(username: str = Depends(get_current_user)):
+    # Verifica e marca o início sob o lock para não disparar dois scrapings
+    with _status_lock:
+        if scraping_status["is_running"]:
+            return {"message": "Scraping already in progress", "status": dict(scraping_status)}
+
+        scraping_status.clear()
+        scraping_status.update({
+            "is_running": True,
+            "current_page": 0,
+            "books_found": 0,
+            "start_time": time.time(),
+            # Total desconhecido: a paginação de cada categoria só é descoberta no crawl
+            "total_pages": None,
+            "status_message": "Scraping in progress..."
+        })
+        status_snapshot = dict(scraping_status)
 
-    if scraping_status["is_running"]:
-        return {"message": "Scraping already in progress", "status": scraping_status}
-    
     def task():
-        global scraping_status
+        # Sessão própria: a sessão assíncrona do request não pode ser usada no worker
+        db = SessionLocal()
+        # Temporário no mesmo diretório: o books.csv anterior só é substituído se o scraping terminar
+        fd, csv_tmp = tempfile.mkstemp(prefix="books.", suffix=".csv.tmp", dir=".")
+        os.close(fd)
         try:
-            scraping_status = {
-                "is_running": True,
-                "current_page": 0,
-                "books_found": 0,
-                "start_time": time.time(),
-                "total_pages": 50,
-                "status_message": "Scraping in progress..."
-            }
-            
             # books = scrape_all_books()
-            books = scrape_all_books_with_progress(update_status_callback)
-            save_to_csv(books, "books.csv")
+            # Cada página raspada já vai para o CSV, sem acumular os dicts em memória
+            save_to_csv(iter_books_with_progress(update_status_callback), csv_tmp)
 
-            # Clear table before inserting new records (optional)
-            db.query(BookModel).delete()
-            db.commit()
+            _update_status(status_message="Saving to DB...")
 
-            scraping_status["status_message"] = "Saving to DB..."
-
-            # Save to DB
-            for i, book in enumerate(books):
-                cleaned_price = "".join(
-                    c for c in book["price"] if c.isdigit() or c == "."
-                )
-                rating_num = rating_order.get(book["rating"], 0)
-                target = 1 if rating_num >= 4 and float(cleaned_price) < 40 else 0
-                db_book = BookModel(
-                    title=book["title"],
-                    price=cleaned_price,
-                    rating=book["rating"],
-                    availability=book["availability"],
-                    category=book["category"],
-                    image_url=book["image_url"],
-                    target=target,
-                )
-                db.add(db_book)
-                if (i + 1) % 50 == 0:
-                    scraping_status["status_message"] = f"Saving... {i+1}/{len(books)} books"
-                    
+            # DataFrame montado pelo parser em C do pandas a partir do CSV recém-gravado
+            books_df = pd.read_csv(
+                csv_tmp, names=BOOK_COLUMNS, header=0, dtype=str, keep_default_na=False
+            )
+            os.replace(csv_tmp, "books.csv")
+            # Limpa preço e calcula o target de forma vetorizada
+            books_df["price"] = (
+                books_df["price"].str.replace(_PRICE_RE, "", regex=True).astype(float)
+            )
+            ratings = books_df["rating"].map(rating_order).fillna(0).to_numpy(dtype=np.int8)
+            prices = books_df["price"].to_numpy(dtype=np.float64)
+            books_df["rating_num"] = ratings
+            books_df["target"] = ((ratings >= 4) & (prices < 40)).astype(np.int8)
+
+            # Limpa a tabela e grava os novos livros numa única transação (um só commit;
+            # os leitores nunca veem o catálogo vazio)
+            _replace_books(db, books_df)
             db.commit()
+            catalog_cache.invalidate()
 
-            print(f"Scraped and inserted {len(books)} books")
+            print(f"Scraped and inserted {len(books_df)} books")
 
-            scraping_status.update({
-                "is_running": False,
-                "last_completion": datetime.utcnow().isoformat(),
-                "final_count": len(books),
-                "status_message": "Successfully completed!",
-                "duration_seconds": time.time() - scraping_status["start_time"]
-            })
+            _update_status(
+                is_running=False,
+                last_completion=datetime.utcnow().isoformat(),
+                final_count=len(books_df),
+                status_message="Successfully completed!",
+                duration_seconds=time.time() - status_snapshot["start_time"],
+            )
             
-            BusinessEventTracker.track_book_scraping(len(books))
+            BusinessEventTracker.track_book_scraping(len(books_df))
 
         except Exception as e:
-            scraping_status.update({
-                "is_running": False,
-                "status_message": f"Erro: {str(e)}",
-                "error": True
-            })
+            _update_status(
+                is_running=False,
+                status_message=f"Erro: {str(e)}",
+                error=True,
+            )
             structured_logger.log_error(
                 error=e, context={"operation": "book_scraping", "user": username}
             )
+        finally:
+            db.close()
+            # Scraping interrompido: descarta o CSV parcial e mantém o books.csv anterior
+            if os.path.exists(csv_tmp):
+                os.remove(csv_tmp)
+
+    app.state.scrape_executor.submit(task)
+    return {"message": "Scraping started", "status": status_snapshot}
+
+
+def _replace_books(db, books_df):
+    """Substitui o conteúdo da tabela books pelas linhas do DataFrame (sem commit)"""
+    if db.get_bind().dialect.driver == "psycopg2":
+        # PostgreSQL: TRUNCATE + COPY FROM STDIN, um único stream em vez de N INSERTs
+        db.execute(text("TRUNCATE books RESTART IDENTITY"))
+        buffer = io.StringIO()
+        books_df.to_csv(buffer, index=False, header=False)
+        buffer.seek(0)
+        columns = ", ".join(books_df.columns)
+        cursor = db.connection().connection.cursor()
+        try:
+            cursor.copy_expert(f"COPY books ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+        finally:
+            cursor.close()
+        return
+
+    # Demais bancos: INSERT Core em executemany, sem passar pelo flush do ORM
+    db.execute(delete(BookModel.__table__))
+    if not books_df.empty:
+        db.execute(insert(BookModel.__table__), books_df.to_dict(orient="records"))
+
+
+def _update_status(**changes):
+    """Atualiza o scraping_status de forma thread-safe"""
+    with _status_lock:
+        scraping_status.update(changes)
 
-    Thread(target=task).start()
-    return {"message": "Scraping started", "status": scraping_status}
 
 def update_status_callback(page_number: int, page_books: int, total_books_so_far: int):
     """Callback chamado pelo scraping para atualizar status"""
-    global scraping_status
-    
-    scraping_status.update({
-        "current_page": page_number,
-        "books_found": total_books_so_far,
-        "status_message": f"Processing page {page_number}... ({total_books_so_far} books found)"
-    })
+    _update_status(
+        current_page=page_number,
+        books_found=total_books_so_far,
+        status_message=f"Processing page {page_number}... ({total_books_so_far} books found)",
+    )
 
 
 # -------------------------------------------------------------------
 # ---------------------- Lista todos os livros ----------------------
 # -------------------------------------------------------------------
 @app.get("/api/v1/books", response_model=List[BookSchema], tags=["Completed"])
-def lista_todos_os_livros_disponiveis(db: Session = Depends(get_db)):
+async def lista_todos_os_livros_disponiveis(db: AsyncSession = Depends(get_db)):
+    # Versão lida antes da consulta: um scraping concorrente impede gravar dados antigos
+    version = catalog_cache.version
+    cached = await catalog_cache.get("books:all")
+    if cached is not None:
+        return cached
+
     start_time = time.time()
     
-    books = db.query(BookModel).all()
+    books = await load_books(db)
     
     duration = time.time() - start_time
     structured_logger.log_database_query(
@@ -238,6 +350,7 @@ def lista_todos_os_livros_disponiveis(db: Session = Depends(get_db)):
         operation="SELECT",
         result_count=len(books)
     )
+    await catalog_cache.set("books:all", books, version)
     return books
 
 
@@ -245,18 +358,18 @@ def lista_todos_os_livros_disponiveis(db: Session = Depends(get_db)):
 # ---------------------- Livros por titulo ou categoria ----------------------
 # ----------------------------------------------------------------------------
 @app.get("/api/v1/books/search", response_model=List[BookSchema], tags=["Completed"])
-def busca_livros_por_titulo_ou_categoria(
-    db: Session = Depends(get_db),
+async def busca_livros_por_titulo_ou_categoria(
+    db: AsyncSession = Depends(get_db),
     title: str = Query(None, description="Title to search"),
     category: str = Query(None, description="Category to filter"),
 ):
-    query = db.query(BookModel)
+    criteria = []
     if title:
-        query = query.filter(BookModel.title.ilike(f"%{title}%"))
+        criteria.append(BookModel.title.ilike(f"%{title}%"))
     if category:
-        query = query.filter(BookModel.category.ilike(f"%{category}%"))
+        criteria.append(BookModel.category.ilike(f"%{category}%"))
 
-    result = query.all()
+    result = await load_books(db, *criteria)
 
     structured_logger.log_business_event(
         event_name="book_search_performed",
@@ -277,13 +390,12 @@ def busca_livros_por_titulo_ou_categoria(
 @app.get(
     "/api/v1/books/price-range", response_model=List[BookSchema], tags=["Statistics"]
 )
-def filtra_livros_em_uma_faixa_de_precos(
-    min_price: float = 0.0, max_price: float = 1000.0, db: Session = Depends(get_db)
+async def filtra_livros_em_uma_faixa_de_precos(
+    min_price: float = 0.0, max_price: float = 1000.0, db: AsyncSession = Depends(get_db)
 ):
-    query = db.query(BookModel)
-    range_price = query.filter(
-        BookModel.price >= min_price, BookModel.price <= max_price
-    ).all()
+    range_price = await load_books(
+        db, BookModel.price >= min_price, BookModel.price <= max_price
+    )
     return range_price
 
 
@@ -295,14 +407,10 @@ def filtra_livros_em_uma_faixa_de_precos(
     response_model=List[BookSchema],
     tags=["Statistics"],
 )
-def books_sorted_by_rating(db: Session = Depends(get_db)):
-    books = db.query(BookModel).all()
-
-    # Sort books based on the rating_order mapping
-    sorted_books = sorted(
-        books,
-        key=lambda x: rating_order.get(x.rating, 0),  # Default to 0 if rating missing
-        reverse=True,
+async def books_sorted_by_rating(db: AsyncSession = Depends(get_db)):
+    # Sort books based on the rating_order mapping (rating_num gravado no scraping)
+    sorted_books = await load_books(
+        db, order_by=(BookModel.rating_num.desc(), BookModel.id)
     )
 
     return sorted_books
@@ -312,22 +420,33 @@ def books_sorted_by_rating(db: Session = Depends(get_db)):
 # ---------------------- Pesquisa o livro pelo ID ----------------------
 # ----------------------------------------------------------------------
 @app.get("/api/v1/books/{id}", response_model=BookSchema, tags=["Completed"])
-def retorna_livro_pelo_id(
-    id: int = Path(..., description="Book ID"), db: Session = Depends(get_db)
+async def retorna_livro_pelo_id(
+    id: int = Path(..., description="Book ID"), db: AsyncSession = Depends(get_db)
 ):
-    book = db.query(BookModel).filter(BookModel.id == id).first()
-    if book is None:
+    books = await load_books(db, BookModel.id == id)
+    if not books:
         raise HTTPException(status_code=404, detail="Book not Found")
-    return book
+    return books[0]
 
 
 # ------------------------------------------------------------------------------------
 # ---------------------- Lista categoria dos livros disponíveis ----------------------
 # ------------------------------------------------------------------------------------
 @app.get("/api/v1/category", response_model=List[str], tags=["Completed"])
-def lista_todas_as_categorias_de_livros_disponiveis(db: Session = Depends(get_db)):
-    categories = db.query(BookModel.category).distinct().all()
-    return [category[0] for category in categories]
+async def lista_todas_as_categorias_de_livros_disponiveis(db: AsyncSession = Depends(get_db)):
+    # As categorias só mudam com um novo scraping: memo em processo antes do Redis
+    categories = catalog_cache.memo_get("books:categories")
+    if categories is not None:
+        return categories
+
+    # Versão lida antes da consulta: um scraping concorrente invalida este resultado
+    version = catalog_cache.version
+    categories = await catalog_cache.get("books:categories")
+    if categories is None:
+        categories = (await db.scalars(select(BookModel.category).distinct())).all()
+        await catalog_cache.set("books:categories", categories, version)
+    catalog_cache.memo_set("books:categories", categories, version)
+    return categories
 
 
 # ------------------------------------------------------------------------------------
@@ -342,62 +461,78 @@ def checar_conectividade_da_api():
 # ---------------------- Total de livros, preço médio e distribuição de ratings ----------------------
 # ----------------------------------------------------------------------------------------------------
 @app.get("/api/v1/stats/overview", tags=["Statistics"])
-def estatisticas_gerais_da_colecao(
-    db: Session = Depends(get_db), username: str = Depends(get_current_user)
+async def estatisticas_gerais_da_colecao(
+    db: AsyncSession = Depends(get_db), username: str = Depends(get_current_user)
 ):
-    total_books = db.query(BookModel.title).count()
-    avg_price = db.query(func.avg(BookModel.price)).scalar() or 0.0
-    avg_price = round(avg_price, 2)
-
-    rating_distribution = (
-        db.query(BookModel.rating, func.count(BookModel.id))
-        .group_by(BookModel.rating)
-        .all()
-    )
-    distribution = {rating: count for rating, count in rating_distribution}
+    version = catalog_cache.version
+    overview = await catalog_cache.get("stats:overview")
+    if overview is None:
+        total_books, avg_price = (
+            await db.execute(select(func.count(BookModel.id), func.avg(BookModel.price)))
+        ).one()
+        avg_price = round(avg_price or 0.0, 2)
+
+        # Ordenado pela contagem: o primeiro rating é o mais comum
+        rating_count = func.count(BookModel.id)
+        rating_distribution = (
+            await db.execute(
+                select(BookModel.rating, rating_count)
+                .group_by(BookModel.rating)
+                .order_by(rating_count.desc(), BookModel.rating)
+            )
+        ).all()
+
+        overview = {
+            "Total of Books": total_books,
+            "Average Price": avg_price,
+            "Rating Distribution": {rating: count for rating, count in rating_distribution},
+        }
+        await catalog_cache.set("stats:overview", overview, version)
 
+    distribution = overview["Rating Distribution"]
     structured_logger.log_business_event(
         event_name="stats_overview_accessed",
         user_id=username,
         context={
-            "total_books": total_books,
-            "avg_price": avg_price,
+            "total_books": overview["Total of Books"],
+            "avg_price": overview["Average Price"],
             "categories_count": len(distribution),
-            "most_common_rating": max(distribution, key=distribution.get)
-            if distribution
-            else None,
+            "most_common_rating": next(iter(distribution), None),
         },
     )
 
-    return {
-        "Total of Books": total_books,
-        "Average Price": avg_price,
-        "Rating Distribution": distribution,
-    }
+    return overview
 
 
 # ----------------------------------------------------------------------------------------
 # ---------------------- Quantidade de livros e preço por categoria ----------------------
 # ----------------------------------------------------------------------------------------
 @app.get("/api/v1/stats/categories", tags=["Statistics"])
-def estatisticas_detalhadas_por_categoria(db: Session = Depends(get_db)):
-    quantity = (
-        db.query(BookModel.category, func.count(BookModel.id))
-        .group_by(BookModel.category)
-        .all()
-    )
-    quantity_category = {category: count for category, count in quantity}
+async def estatisticas_detalhadas_por_categoria(db: AsyncSession = Depends(get_db)):
+    version = catalog_cache.version
+    cached = await catalog_cache.get("stats:categories")
+    if cached is not None:
+        return cached
+
+    rows = (
+        await db.execute(
+            select(
+                BookModel.category, func.count(BookModel.id), func.avg(BookModel.price)
+            ).group_by(BookModel.category)
+        )
+    ).all()
 
-    price = (
-        db.query(BookModel.category, func.avg(BookModel.price))
-        .group_by(BookModel.category)
-        .all()
-    )
-    price_category = {category: round(avg_price, 2) for category, avg_price in price}
-    return {
+    quantity_category = {}
+    price_category = {}
+    for category, count, avg_price in rows:
+        quantity_category[category] = count
+        price_category[category] = round(avg_price, 2)
+    stats = {
         "Quantity by Category": quantity_category,
         "Price by Category": price_category,
     }
+    await catalog_cache.set("stats:categories", stats, version)
+    return stats
 
 
 #  {
@@ -437,59 +572,112 @@ def estatisticas_detalhadas_por_categoria(db: Session = Depends(get_db)):
 # ----------------------------------------------------------------------------------------
 # ------------------------ Dados formatados para features --------------------------------
 # ----------------------------------------------------------------------------------------
+ML_FIELDNAMES = ["price", "rating", "category", "availability", "target"]
+
+
+def _ml_features(book):
+    """Converte uma linha do ml_select no dicionário de features usado pelos endpoints de ML"""
+    # A linha é desempacotada como tupla, na ordem das colunas do ml_select
+    price, rating, category, availability, target = book
+    return {
+        "price": price,
+        "rating": rating,
+        "category": category,
+        "availability": int(availability.startswith("In stock")),
+        "target": target,
+    }
+
+
+async def _batched(rows, size):
+    """Agrupa um iterável assíncrono em listas de até `size` itens"""
+    batch = []
+    async for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+ML_MEDIA_TYPES = {"json": "application/json", "csv": "text/csv"}
+
+
+async def _stream_ml_export(rows, csv_path, fmt="json", batch_size=1000):
+    """Grava o CSV e emite as linhas em lotes (lista JSON ou CSV), à medida que chegam"""
+    with open(csv_path, "w", newline="", encoding="utf-8") as f:
+        # Escrita do CSV via writer em C do pandas
+        header = pd.DataFrame(columns=ML_FIELDNAMES).to_csv(index=False)
+        f.write(header)
+        if fmt == "csv":
+            yield header
+            async for batch in _batched(rows, batch_size):
+                # O mesmo texto vai para o arquivo e para a resposta
+                chunk = pd.DataFrame(batch, columns=ML_FIELDNAMES).to_csv(header=False, index=False)
+                f.write(chunk)
+                yield chunk
+            return
+
+        separator = b"["
+        async for batch in _batched(rows, batch_size):
+            pd.DataFrame(batch, columns=ML_FIELDNAMES).to_csv(f, header=False, index=False)
+            yield separator + orjson.dumps(batch)[1:-1]
+            separator = b","
+        yield b"]" if separator == b"," else b"[]"
+
+
 @app.get("/api/v1/ml/features", tags=["ML"])
-def get_ml_features(db: Session = Depends(get_db)):
-    books = db.query(BookModel).all()
-    features = []
-    for book in books:
-        features.append(
-            {
-                "price": book.price,
-                "rating": rating_order.get(book.rating, 0),
-                "category": book.category,
-                "availability": 1 if "In stock" in book.availability else 0,
-                "target": book.target,
-            }
-        )
-    # Gera arquivo CSV
-    with open("ml_features.csv", "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(
-            f, fieldnames=["price", "rating", "category", "availability", "target"]
-        )
-        writer.writeheader()
-        writer.writerows(features)
-    return features
+async def get_ml_features(fmt: str = Query("json", alias="format", pattern="^(json|csv)$")):
+    async def rows():
+        # Sessão própria: a dependência get_db é fechada antes do streaming
+        async with AsyncSessionLocal() as db:
+            books = await db.stream(ml_select.execution_options(yield_per=1000))
+            async for book in books:
+                yield _ml_features(book)
+
+    return StreamingResponse(
+        _stream_ml_export(rows(), "ml_features.csv", fmt), media_type=ML_MEDIA_TYPES[fmt]
+    )
 
 
 # ----------------------------------------------------------------------------------------
 # ------------------------ Dataset para treinamento --------------------------------------
 # ----------------------------------------------------------------------------------------
+async def _reservoir_sample(rows, k, rng):
+    """Amostra uniforme de k linhas de um iterável assíncrono (algoritmo R)"""
+    reservoir = []
+    i = 0
+    async for row in rows:
+        if i < k:
+            reservoir.append(row)
+        else:
+            j = rng.integers(i + 1)
+            if j < k:
+                reservoir[j] = row
+        i += 1
+    # O algoritmo R preserva a ordem de chegada; embaralha a amostra final
+    rng.shuffle(reservoir)
+    return reservoir
+
+
 @app.get("/api/v1/ml/training-data", tags=["ML"])
-def get_training_data(db: Session = Depends(get_db)):
-    books = db.query(BookModel).all()
-    data = []
-    for book in books:
-        data.append(
-            {
-                "price": book.price,
-                "rating": rating_order.get(book.rating, 0),
-                "category": book.category,
-                "availability": 1 if "In stock" in book.availability else 0,
-                "target": book.target,
-            }
-        )
-    # Embaralha e divide em 70% para treinamento
-    random.shuffle(data)
-    split_idx = int(len(data) * 0.7)
-    train_data = data[:split_idx]
-    # Gera arquivo CSV
-    with open("ml_training_data.csv", "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(
-            f, fieldnames=["price", "rating", "category", "availability", "target"]
-        )
-        writer.writeheader()
-        writer.writerows(train_data)
-    return train_data
+async def get_training_data(
+    fmt: str = Query("json", alias="format", pattern="^(json|csv)$"),
+    db: AsyncSession = Depends(get_db),
+):
+    # 70% do catálogo para treinamento, amostrados sem carregar a tabela inteira
+    total = await db.scalar(select(func.count(BookModel.id)))
+    split_idx = int(total * 0.7)
+    books = await db.stream(ml_select.execution_options(yield_per=1000))
+    train = await _reservoir_sample(books, split_idx, np.random.default_rng())
+
+    async def rows():
+        for book in train:
+            yield _ml_features(book)
+
+    return StreamingResponse(
+        _stream_ml_export(rows(), "ml_training_data.csv", fmt), media_type=ML_MEDIA_TYPES[fmt]
+    )
 
 
 # ----------------------------------------------------------------------------------------
@@ -502,17 +690,38 @@ class MLFeatures(BaseModel):
     availability: int
 
 
+@lru_cache(maxsize=1)
+def _load_model():
+    """Carrega o modelo treinado e o encoder de categoria uma única vez por processo"""
+    with open("book_recommendation_model.pkl", "rb") as f:
+        model = pickle.load(f)
+    with open("category_encoder.pkl", "rb") as f:
+        category_encoder = pickle.load(f)
+    return model, category_encoder
+
+
+@lru_cache(maxsize=256)
+def _encode_category(category: str) -> int:
+    """Codifica a categoria com o encoder treinado (categorias se repetem entre predições)"""
+    _, category_encoder = _load_model()
+    return int(category_encoder.transform([category])[0])
+
+
+@app.on_event("startup")
+def warm_ml_model():
+    # Evita que a primeira predição pague o custo do unpickle
+    try:
+        _load_model()
+    except Exception as e:
+        structured_logger.log_error(error=e, context={"operation": "ml_model_load"})
+
+
 @app.post("/api/v1/ml/predictions", tags=["ML"])
 def ml_predictions(features: MLFeatures, current_user: str = Depends(get_current_user)):
     try:
-        # Carrega o modelo treinado
-        with open("book_recommendation_model.pkl", "rb") as f:
-            model = pickle.load(f)
-        # Carrega o encoder de categoria
-        with open("category_encoder.pkl", "rb") as f:
-            category_encoder = pickle.load(f)
+        model, _ = _load_model()
         # Transforma a categoria
-        category_encoded = int(category_encoder.transform([features.category])[0])
+        category_encoded = _encode_category(features.category)
         # Prepara os dados para o modelo
         input_data = np.array(
             [[features.price, features.rating, category_encoded, features.availability]]
@@ -543,9 +752,11 @@ def ml_predictions(features: MLFeatures, current_user: str = Depends(get_current
 # ------------------------ Endpoint para Monitoramento -----------------------------------
 # ----------------------------------------------------------------------------------------
 @app.get("/api/v1/monitoring/metrics", tags=["Monitoring"])
-def get_metrics():
+def get_metrics(pretty: bool = Query(False, description="Agrupa as métricas por categoria")):
     """Endpoint para métricas do Prometheus"""
-    return Response(content=metrics.get_metrics(), media_type="text/plain")
+    if pretty:
+        return Response(content=metrics.get_pretty_metrics(), media_type="text/plain")
+    return Response(content=metrics.get_metrics(), media_type=CONTENT_TYPE_LATEST)
 
 
 # ----------------------------------------------------------------------------------------
@@ -554,6 +765,12 @@ def get_metrics():
 @app.get("/api/v1/monitoring/dashboard", tags=["Monitoring"])
 def get_dashboard_data():
     """Dados para dashboard de monitoramento"""
+    return _cached_dashboard_data()
+
+
+@ttl_cache(5)
+def _cached_dashboard_data():
+    # Os exports relêem os logs; com TTL curto o polling da dashboard vira lookup
     return {
         "current_metrics": exporter.export_current_metrics(),
         "historical_data": exporter.export_historical_data(hours=24),
@@ -1,13 +1,43 @@
-from sqlalchemy import create_engine
+import os
+from sqlalchemy import create_engine, make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+# SQLite local por padrão; DATABASE_URL permite apontar para um PostgreSQL
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./database/fiap.db")
+
+# Driver assíncrono equivalente a cada backend suportado
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+_url = make_url(SQLALCHEMY_DATABASE_URL)
+SQLALCHEMY_ASYNC_DATABASE_URL = _url.set(drivername=ASYNC_DRIVERS[_url.get_backend_name()])
 
 # Required only for SQLite (avoids threading issues)
-SQLALCHEMY_DATABASE_URL = "sqlite:///./database/fiap.db"
+CONNECT_ARGS = {"check_same_thread": False} if _url.get_backend_name() == "sqlite" else {}
+
+# Pool dimensionado para concorrência: evita fila no pool padrão de 5 conexões
+POOL_OPTIONS = {
+    "pool_size": 20,
+    "max_overflow": 40,
+    "pool_pre_ping": True,
+    "pool_recycle": 1800,
+}
 
+# Engine síncrona: usada no create_all e na thread de scraping
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+    SQLALCHEMY_DATABASE_URL, connect_args=CONNECT_ARGS, **POOL_OPTIONS
 )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Engine assíncrona: usada pelos endpoints da API
+# aiosqlite usa NullPool por padrão (uma conexão nova por sessão); força o pool
+async_engine = create_async_engine(
+    SQLALCHEMY_ASYNC_DATABASE_URL, poolclass=AsyncAdaptedQueuePool, **POOL_OPTIONS
+)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False
+)
+
 Base = declarative_base()
@@ -1,9 +1,9 @@
-from database.database import SessionLocal
-from sqlalchemy.orm import Session
+from database.database import AsyncSessionLocal
+from sqlalchemy.ext.asyncio import AsyncSession
 
-def get_db():
-    db = SessionLocal()
+async def get_db():
+    db = AsyncSessionLocal()
     try:
         yield db
     finally:
-        db.close()
+        await db.close()
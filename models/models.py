@@ -1,14 +1,75 @@
-from sqlalchemy import Column, Integer, String, Float
+from sqlalchemy import (
+    DDL, Column, Index, Integer, SmallInteger, String, Float, case, event, inspect, text, update,
+)
 from database.database import Base
 
+RATING_ORDER = {"One": 1, "Two": 2, "Three": 3, "Four": 4, "Five": 5}
+
 class Book(Base):
     __tablename__ = "books"
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, index=True)
-    category = Column(String, index=True)
-    price= Column(Float)
+    # category é coberta pelos índices compostos (prefixo) em __table_args__
+    category = Column(String)
+    price= Column(Float, index=True)
     rating= Column(String, index=True)
+    # Nota numérica (1-5, 0 se desconhecida) gravada no scraping; evita o remapeamento do rating
+    rating_num = Column(SmallInteger)
     availability= Column(String, index=True)
-    image_url= Column(String, index=True)
-    target = Column(Integer, default=0)
\ No newline at end of file
+    image_url= Column(String)
+    target = Column(Integer, default=0)
+
+    __table_args__ = (
+        # Cobrem os GROUP BY category das estatísticas (contagem/distribuição e preço médio)
+        Index("ix_books_category_rating", "category", "rating"),
+        Index("ix_books_category_price", "category", "price"),
+        # Índices trigram para as buscas ilike '%...%' (somente PostgreSQL)
+        Index(
+            "ix_books_title_trgm",
+            "title",
+            postgresql_using="gin",
+            postgresql_ops={"title": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+        Index(
+            "ix_books_category_trgm",
+            "category",
+            postgresql_using="gin",
+            postgresql_ops={"category": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+    )
+
+
+event.listen(
+    Book.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+
+# Percorre o ORDER BY rating_num DESC, id do /books/sorted_by_rating sem ordenar a tabela
+rating_num_index = Index("ix_books_rating_num", Book.rating_num.desc(), Book.id)
+
+# Mesmo mapeamento do RATING_ORDER avaliado no banco; usado para preencher rating_num
+rating_rank = case(RATING_ORDER, value=Book.rating, else_=0)
+
+
+# Índices adicionados depois da criação original da tabela; o create_all não os cria
+# numa tabela books já existente
+UPGRADE_INDEXES = ("ix_books_price", "ix_books_category_rating", "ix_books_category_price")
+
+
+def upgrade_books_schema(bind):
+    """Atualiza bancos criados antes de rating_num e dos índices novos (idempotente)"""
+    with bind.begin() as conn:
+        columns = {column["name"] for column in inspect(conn).get_columns("books")}
+        if "rating_num" not in columns:
+            conn.execute(text("ALTER TABLE books ADD COLUMN rating_num SMALLINT"))
+        rating_num_index.create(conn, checkfirst=True)
+        for index in Book.__table__.indexes:
+            if index.name in UPGRADE_INDEXES:
+                index.create(conn, checkfirst=True)
+        conn.execute(
+            update(Book.__table__)
+            .where(Book.rating_num.is_(None))
+            .values(rating_num=rating_rank)
+        )
@@ -3,6 +3,7 @@ from .metrics import metrics
 from .middleware import RequestMonitoringMiddleware, BusinessEventTracker
 from .exporters import exporter
 from .config import MonitoringConfig
+from .system import system_sampler
 
 __all__ = [
     'structured_logger',
@@ -10,5 +11,6 @@ __all__ = [
     'RequestMonitoringMiddleware',
     'BusinessEventTracker',
     'exporter',
-    'MonitoringConfig'
+    'MonitoringConfig',
+    'system_sampler'
 ]
\ No newline at end of file
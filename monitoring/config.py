@@ -10,6 +10,8 @@ class MonitoringConfig:
     LOG_FILE_PATH: Path = Path("logs/app.log")
     LOG_ROTATION: str = "100 MB"
     LOG_RETENTION: str = "30 days"
+    # Janela de logs mantida em memória pelo exportador (dashboard usa 24h)
+    EXPORTER_WINDOW_HOURS: int = 24
     
     METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "true").lower() == "true"
     METRICS_PORT: int = int(os.getenv("METRICS_PORT", "9090"))
@@ -18,6 +20,8 @@ class MonitoringConfig:
     SLOW_REQUEST_THRESHOLD: float = 1.0
     ENABLE_REQUEST_BODY_LOGGING: bool = False
     MAX_REQUEST_BODY_SIZE: int = 1024
+    # Fração das requisições com body logado (1.0 = todas)
+    REQUEST_BODY_SAMPLE_RATE: float = float(os.getenv("REQUEST_BODY_SAMPLE_RATE", "1.0"))
     
     DB_QUERY_SLOW_THRESHOLD: float = 0.5
     
@@ -1,84 +1,102 @@
-import json
+import orjson
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional
 from pathlib import Path
-import re
-from collections import defaultdict, Counter
-from .metrics import metrics
+from collections import deque
+from threading import Lock
+import numpy as np
+import pandas as pd
 from .config import MonitoringConfig
+from .system import system_sampler
+
+# Tamanho de cada leitura do app.log (1 MiB)
+READ_BLOCK_SIZE = 1024 * 1024
 
 class MetricsExporter:
     """Exportador de métricas para consumo externo - DADOS REAIS"""
     
     def __init__(self, config: Optional[MonitoringConfig] = None):
         self.config = config or MonitoringConfig()
+        # Estado da leitura incremental do app.log (protegido por _lock)
+        self._lock = Lock()
+        self._offset = 0
+        self._inode = None
+        self._entries = deque()
         
     def _read_structured_logs(self, since: Optional[datetime] = None) -> List[Dict]:
-        """Lê logs estruturados reais do arquivo JSON"""
-        logs = []
+        """Lê logs estruturados reais do arquivo JSON (somente as linhas novas desde a última leitura)"""
+        with self._lock:
+            self._tail_log_file()
+            # As entradas estão em ordem de escrita; a janela recente fica no fim
+            if since is None:
+                return list(self._entries)
+            logs = []
+            for log_entry in reversed(self._entries):
+                if log_entry['parsed_timestamp'] < since:
+                    break
+                logs.append(log_entry)
+            logs.reverse()
+            return logs
+
+    def _tail_log_file(self) -> None:
+        """Lê do último offset até o fim do arquivo e descarta entradas fora da janela"""
         log_file = Path(self.config.LOG_FILE_PATH)
         
-        if not log_file.exists():
-            return logs
+        try:
+            stat = log_file.stat()
+        except FileNotFoundError:
+            self._offset, self._inode = 0, None
+            self._entries.clear()
+            return
+            
+        # Rotação (novo arquivo) ou truncamento: recomeça do início
+        if stat.st_ino != self._inode or stat.st_size < self._offset:
+            self._offset, self._inode = 0, stat.st_ino
+            self._entries.clear()
             
         try:
-            with open(log_file, 'r', encoding='utf-8') as f:
-                for line in f:
-                    if line.strip():
-                        try:
-                            log_entry = json.loads(line.strip())
-                            timestamp_raw = log_entry.get('record', {}).get('time', {}).get('timestamp')
-                            if timestamp_raw:
-                                log_timestamp = datetime.fromtimestamp(timestamp_raw)
-                            
-                                if since and log_timestamp < since:
-                                    continue
-                                    
-                                log_entry['parsed_timestamp'] = log_timestamp
-                                logs.append(log_entry)
-                                
-                        except json.JSONDecodeError:
-                            continue
+            if stat.st_size > self._offset:
+                with open(log_file, 'rb') as f:
+                    f.seek(self._offset)
+                    remaining = stat.st_size - self._offset
+                    pending = b''
+                    # Blocos limitados: a primeira leitura de um log grande não carrega tudo de uma vez
+                    while remaining > 0:
+                        block = f.read(min(READ_BLOCK_SIZE, remaining))
+                        if not block:
+                            break
+                        remaining -= len(block)
+                        block = pending + block
+                        # Só consome linhas completas; a parcial segue para o próximo bloco
+                        end = block.rfind(b'\n') + 1
+                        pending = block[end:]
+                        self._offset += end
+                        self._parse_lines(block[:end])
                             
         except Exception as e:
             print(f"Erro ao ler logs: {e}")
             
-        return logs
+        cutoff = datetime.now() - timedelta(hours=self.config.EXPORTER_WINDOW_HOURS)
+        while self._entries and self._entries[0]['parsed_timestamp'] < cutoff:
+            self._entries.popleft()
     
-    def _extract_prometheus_metrics(self) -> Dict[str, Any]:
-        """Extrai métricas reais do Prometheus"""
-        try:
-            raw_metrics = metrics.get_metrics()
-            parsed_metrics = {}
-            
-            for line in raw_metrics.split('\n'):
-                if line.startswith('#') or not line.strip():
-                    continue
-                    
-                if '{' in line:
-                    metric_name = line.split('{')[0]
-                    value_part = line.split('}')[1].strip()
-                    value = float(value_part) if value_part else 0.0
-                    
-                    if metric_name not in parsed_metrics:
-                        parsed_metrics[metric_name] = []
-                    parsed_metrics[metric_name].append(value)
-                else:
-                    parts = line.split()
-                    if len(parts) >= 2:
-                        metric_name, value = parts[0], float(parts[1])
-                        parsed_metrics[metric_name] = value
+    def _parse_lines(self, data: bytes) -> None:
+        """Converte linhas JSON completas em entradas com parsed_timestamp"""
+        for line in data.splitlines():
+            if line.strip():
+                try:
+                    log_entry = orjson.loads(line)
+                    timestamp_raw = log_entry.get('record', {}).get('time', {}).get('timestamp')
+                    if timestamp_raw:
+                        log_entry['parsed_timestamp'] = datetime.fromtimestamp(timestamp_raw)
+                        self._entries.append(log_entry)
                         
-            return parsed_metrics
-            
-        except Exception as e:
-            print(f"Erro ao extrair métricas Prometheus: {e}")
-            return {}
+                except orjson.JSONDecodeError:
+                    continue
     
     def export_current_metrics(self) -> Dict[str, Any]:
         """Exporta métricas atuais - DADOS REAIS"""
         logs = self._read_structured_logs(since=datetime.now() - timedelta(hours=1))
-        prometheus_metrics = self._extract_prometheus_metrics()
         # Calcular métricas reais dos logs
         http_requests = [log for log in logs 
                         if log.get('record', {}).get('extra', {}).get('event_type') == 'http_request']
@@ -86,9 +104,6 @@ class MetricsExporter:
         business_events = [log for log in logs 
                           if log.get('record', {}).get('extra', {}).get('event_type') == 'business_event']
         
-        error_events = [log for log in logs 
-                       if log.get('record', {}).get('extra', {}).get('event_type') == 'error']
-        
         return {
             "total_requests": len(http_requests),
             "success_rate": self._calculate_real_success_rate(http_requests),
@@ -105,10 +120,12 @@ class MetricsExporter:
         """Exporta dados históricos - DADOS REAIS"""
         since = datetime.now() - timedelta(hours=hours)
         logs = self._read_structured_logs(since=since)
+        # Agregações por hora feitas em pandas sobre um único DataFrame
+        http_df = self._http_requests_frame(logs)
         
         return {
-            "http_requests_timeline": self._get_real_requests_timeline(logs, hours),
-            "response_times_timeline": self._get_real_response_times_timeline(logs, hours),
+            "http_requests_timeline": self._get_real_requests_timeline(http_df, hours),
+            "response_times_timeline": self._get_real_response_times_timeline(http_df, hours),
             "system_metrics_timeline": self._get_real_system_timeline(hours),
             "error_events": self._get_real_error_events(logs)
         }
@@ -173,78 +190,54 @@ class MetricsExporter:
         
         return len(failed_logins) / len(login_events)
     
-    def _get_real_requests_timeline(self, logs: List[Dict], hours: int) -> List[Dict]:
-        """Timeline real de requisições"""
-        http_requests = [log for log in logs 
-                        if log.get('record', {}).get('extra', {}).get('event_type') == 'http_request']
-        
-        hourly_data = defaultdict(lambda: {'count': 0, 'total_duration': 0})
+    def _http_requests_frame(self, logs: List[Dict]) -> pd.DataFrame:
+        """Monta um DataFrame (hora, duração) com as requisições HTTP dos logs"""
+        rows = []
+        for log in logs:
+            extra = log.get('record', {}).get('extra', {})
+            if extra.get('event_type') == 'http_request':
+                rows.append((log['parsed_timestamp'], extra.get('duration_ms', 0)))
         
-        for req in http_requests:
-            timestamp = req.get('parsed_timestamp')
-            if timestamp:
-                hour_key = timestamp.replace(minute=0, second=0, microsecond=0)
-                hourly_data[hour_key]['count'] += 1
-                duration = req.get('record', {}).get('extra', {}).get('duration_ms', 0)
-                hourly_data[hour_key]['total_duration'] += duration
+        frame = pd.DataFrame(rows, columns=['timestamp', 'duration'])
+        frame['hour'] = pd.to_datetime(frame['timestamp']).dt.floor('h')
+        return frame
+    
+    def _get_real_requests_timeline(self, http_df: pd.DataFrame, hours: int) -> List[Dict]:
+        """Timeline real de requisições"""
+        hourly = http_df.groupby('hour')['duration'].agg(['count', 'mean'])
         
-        timeline = []
-        for hour, data in sorted(hourly_data.items()):
-            avg_response_time = data['total_duration'] / data['count'] if data['count'] > 0 else 0
-            timeline.append({
+        return [
+            {
                 "timestamp": hour.isoformat(),
-                "requests_count": data['count'],
-                "avg_response_time": avg_response_time
-            })
-        
-        return timeline
+                "requests_count": int(row['count']),
+                "avg_response_time": float(row['mean'])
+            }
+            for hour, row in hourly.iterrows()
+        ]
     
-    def _get_real_response_times_timeline(self, logs: List[Dict], hours: int) -> List[Dict]:
+    def _get_real_response_times_timeline(self, http_df: pd.DataFrame, hours: int) -> List[Dict]:
         """Timeline real de tempos de resposta"""
-        http_requests = [log for log in logs 
-                        if log.get('record', {}).get('extra', {}).get('event_type') == 'http_request']
-        
-        hourly_data = defaultdict(list)
-        
-        for req in http_requests:
-            timestamp = req.get('parsed_timestamp')
-            if timestamp:
-                hour_key = timestamp.replace(minute=0, second=0, microsecond=0)
-                duration = req.get('record', {}).get('extra', {}).get('duration_ms', 0)
-                hourly_data[hour_key].append(duration)
-        
         timeline = []
-        for hour, durations in sorted(hourly_data.items()):
-            if durations:
-                durations.sort()
-                p50_idx = int(len(durations) * 0.5)
-                p95_idx = int(len(durations) * 0.95)
-                p99_idx = int(len(durations) * 0.99)
-                
-                timeline.append({
-                    "timestamp": hour.isoformat(),
-                    "p50": durations[p50_idx] if p50_idx < len(durations) else 0,
-                    "p95": durations[p95_idx] if p95_idx < len(durations) else 0,
-                    "p99": durations[p99_idx] if p99_idx < len(durations) else 0
-                })
+        for hour, durations in http_df.groupby('hour')['duration']:
+            n = len(durations)
+            p50_idx = int(n * 0.5)
+            p95_idx = int(n * 0.95)
+            p99_idx = int(n * 0.99)
+            # Seleção parcial O(n) (introselect) em vez de ordenar a hora inteira
+            selected = np.partition(durations.to_numpy(dtype=np.float64), [p50_idx, p95_idx, p99_idx])
+            
+            timeline.append({
+                "timestamp": hour.isoformat(),
+                "p50": float(selected[p50_idx]),
+                "p95": float(selected[p95_idx]),
+                "p99": float(selected[p99_idx])
+            })
         
         return timeline
     
     def _get_real_system_timeline(self, hours: int) -> List[Dict]:
-        """Timeline real de métricas de sistema do Prometheus"""
-        import psutil
-        
-        current_time = datetime.now()
-        timeline = []
-        
-        timeline.append({
-            "timestamp": current_time.isoformat(),
-            "cpu_percent": psutil.cpu_percent(),
-            "memory_percent": psutil.virtual_memory().percent,
-            "disk_percent": psutil.disk_usage('/').percent
-        })
-        
-        return timeline
+        """Timeline real de métricas de sistema (última amostra do SystemSampler)"""
+        return [system_sampler.snapshot()]
     
     def _get_real_error_events(self, logs: List[Dict]) -> List[Dict]:
         """Eventos de erro reais dos logs"""
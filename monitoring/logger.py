@@ -1,8 +1,6 @@
-import json
-import time
-from datetime import datetime
+import orjson
+import sys
 from typing import Any, Dict, Optional
-from pathlib import Path
 from loguru import logger
 from .config import MonitoringConfig
 
@@ -19,14 +17,18 @@ class StructuredLogger:
         """Configura o sistema de logging estruturado"""
 
         logger.remove()
+        # Nível mínimo numérico, para os chamadores pularem eventos que seriam descartados
+        self._min_level_no = logger.level(self.config.LOG_LEVEL).no
 
         self.config.LOG_FILE_PATH.parent.mkdir(parents=True, exist_ok=True)
 
+        # Stream direto (sem lambda/print); a escrita sai da thread do request via enqueue
         logger.add(
-            sink=lambda msg: print(msg, end=""),
+            sink=sys.stderr,
             format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan> | <level>{message}</level>",
             level=self.config.LOG_LEVEL,
             colorize=True,
+            enqueue=True,
         )
 
         logger.add(
@@ -34,27 +36,62 @@ class StructuredLogger:
             level=self.config.LOG_LEVEL,
             rotation=self.config.LOG_ROTATION,
             retention=self.config.LOG_RETENTION,
-            serialize=True,
+            format=self._get_json_format,
             enqueue=True,
         )
 
-    def _get_json_format(self, record):
-        """Formato JSON estruturado - função que retorna string"""
+    def is_enabled(self, level: str) -> bool:
+        """Indica se mensagens de `level` chegam a algum sink"""
+        return logger.level(level).no >= self._min_level_no
+
+    def complete(self):
+        """Aguarda a escrita das mensagens enfileiradas nos sinks"""
+        logger.complete()
 
+    def _get_json_format(self, record):
+        """Formato JSON estruturado - mesmo layout do serialize=True do loguru, gerado com orjson"""
+
+        exception = record["exception"]
+        if exception is not None:
+            exception = {
+                "type": None if exception.type is None else exception.type.__name__,
+                "value": exception.value,
+                "traceback": bool(exception.traceback),
+            }
+
+        time_ = record["time"]
+        level = record["level"]
         log_entry = {
-            "timestamp": record["time"].isoformat(),
-            "level": record["level"].name,
-            "logger": record["name"],
-            "module": record["module"],
-            "function": record["function"],
-            "line": record["line"],
-            "message": record["message"],
+            "text": (
+                f"{time_:%Y-%m-%d %H:%M:%S}.{time_.microsecond // 1000:03d} | {level.name: <8} | "
+                f"{record['name']}:{record['function']}:{record['line']} - {record['message']}\n"
+            ),
+            "record": {
+                "elapsed": {
+                    "repr": record["elapsed"],
+                    "seconds": record["elapsed"].total_seconds(),
+                },
+                "exception": exception,
+                "extra": record["extra"],
+                "file": {"name": record["file"].name, "path": record["file"].path},
+                "function": record["function"],
+                "level": {"icon": level.icon, "name": level.name, "no": level.no},
+                "line": record["line"],
+                "message": record["message"],
+                "module": record["module"],
+                "name": record["name"],
+                "process": {"id": record["process"].id, "name": record["process"].name},
+                "thread": {"id": record["thread"].id, "name": record["thread"].name},
+                "time": {"repr": time_, "timestamp": time_.timestamp()},
+            },
         }
 
-        if "extra" in record and record["extra"]:
-            log_entry.update(record["extra"])
-
-        return json.dumps(log_entry, ensure_ascii=False, default=str) + "\n"
+        # orjson serializa datetime nativamente; default=str cobre timedelta e objetos do extra,
+        # OPT_NON_STR_KEYS aceita chaves não-str (int, etc.) como o json.dumps
+        record["extra"]["serialized"] = orjson.dumps(
+            log_entry, default=str, option=orjson.OPT_NON_STR_KEYS
+        ).decode()
+        return "{extra[serialized]}\n"
 
     def log_request(
         self,
@@ -66,9 +103,13 @@ class StructuredLogger:
         request_id: Optional[str] = None,
         user_agent: Optional[str] = None,
         ip_address: Optional[str] = None,
+        duration_ms: Optional[float] = None,
         **kwargs,
     ):
-        """Log estruturado de requisições HTTP"""
+        """Log estruturado de requisições HTTP (`duration_ms` reaproveita o valor já calculado)"""
+
+        if duration_ms is None:
+            duration_ms = round(duration * 1000, 2)
 
         if status_code >= 500:
             level = "ERROR"
@@ -84,13 +125,13 @@ class StructuredLogger:
             method=method,
             path=path,
             status_code=status_code,
-            duration_ms=round(duration * 1000, 2),
+            duration_ms=duration_ms,
             request_id=request_id,
             user_id=user_id,
             user_agent=user_agent,
             ip_address=ip_address,
             **kwargs,
-        ).log(level, f"{method} {path} - {status_code} - {duration * 1000:.2f}ms")
+        ).log(level, f"{method} {path} - {status_code} - {duration_ms:.2f}ms")
 
     def log_database_query(
         self,
@@ -103,15 +144,16 @@ class StructuredLogger:
         """Log estruturado de queries de database"""
 
         level = "WARNING" if duration > self.config.DB_QUERY_SLOW_THRESHOLD else "DEBUG"
+        duration_ms = round(duration * 1000, 2)
 
         logger.bind(
             event_type="database_query",
             query=query[:200] + "..." if len(query) > 200 else query,
-            duration_ms=round(duration * 1000, 2),
+            duration_ms=duration_ms,
             table=table,
             operation=operation,
             **kwargs,
-        ).log(level, f"DB Query - {duration * 1000:.2f}ms")
+        ).log(level, f"DB Query - {duration_ms:.2f}ms")
 
     def log_business_event(
         self, event_name: str, user_id: Optional[str] = None, **context
@@ -1,16 +1,40 @@
 import time
-import psutil
-from typing import Dict, Any, Optional
+from typing import Optional
 from prometheus_client import Counter, Histogram, Gauge, CollectorRegistry, generate_latest
-from functools import wraps
 from contextlib import contextmanager
 
+# Buckets dimensionados para a latência real de cada sinal: cada bucket vira uma
+# série por combinação de labels, então só mantemos os que distinguem algo
+# HTTP: maioria das rotas abaixo de 100ms; timeout prático em torno de 2.5s
+HTTP_DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+# DB: consultas locais na casa de sub-milissegundos; acima de 0.5s já é lenta
+DB_DURATION_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5)
+
+# Saída do /metrics reaproveitada por alguns segundos entre scrapes
+METRICS_CACHE_TTL = 5.0
+
+# Prefixo da métrica -> seção no texto formatado (na ordem de exibição)
+METRIC_CATEGORIES = {
+    'http_': 'HTTP METRICS',
+    'system_': 'SYSTEM METRICS', 
+    'db_': 'DATABASE METRICS',
+    'books_': 'BUSINESS METRICS (Books)',
+    'ml_': 'MACHINE LEARNING METRICS',
+    'user_': 'USER METRICS'
+}
+SECTION_ORDER = (*METRIC_CATEGORIES, 'other')
+
 class MetricsCollector:
     """Coletor de métricas enterprise para APIs"""
     
     def __init__(self, registry: Optional[CollectorRegistry] = None):
         self.registry = registry or CollectorRegistry()
         self._setup_metrics()
+        # Filhos já resolvidos por combinação de labels: evita o labels() a cada requisição
+        self._http_children = {}
+        self._db_children = {}
+        # (instante da geração, exposição) da última chamada a get_metrics
+        self._cache = (float('-inf'), b"")
         
     def _setup_metrics(self):
         """Configura as métricas do Prometheus"""
@@ -26,7 +50,7 @@ class MetricsCollector:
             'http_request_duration_seconds',
             'HTTP request duration',
             ['method', 'endpoint'],
-            buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+            buckets=HTTP_DURATION_BUCKETS,
             registry=self.registry
         )
         
@@ -47,7 +71,7 @@ class MetricsCollector:
             'db_query_duration_seconds',
             'Database query duration',
             ['table', 'operation'],
-            buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0),
+            buckets=DB_DURATION_BUCKETS,
             registry=self.registry
         )
         
@@ -91,16 +115,17 @@ class MetricsCollector:
     
     def record_http_request(self, method: str, endpoint: str, status_code: int, duration: float):
         """Registra métricas de requisição HTTP"""
-        self.http_requests_total.labels(
-            method=method,
-            endpoint=endpoint, 
-            status_code=str(status_code)
-        ).inc()
+        key = (method, endpoint, status_code)
+        children = self._http_children.get(key)
+        if children is None:
+            children = self._http_children[key] = (
+                self.http_requests_total.labels(method, endpoint, str(status_code)),
+                self.http_request_duration.labels(method, endpoint),
+            )
         
-        self.http_request_duration.labels(
-            method=method,
-            endpoint=endpoint
-        ).observe(duration)
+        requests_total, request_duration = children
+        requests_total.inc()
+        request_duration.observe(duration)
     
     @contextmanager
     def track_http_request_in_progress(self):
@@ -113,29 +138,28 @@ class MetricsCollector:
     
     def record_db_query(self, table: str, operation: str, duration: float):
         """Registra métricas de query de database"""
-        self.db_queries_total.labels(
-            table=table,
-            operation=operation
-        ).inc()
+        key = (table, operation)
+        children = self._db_children.get(key)
+        if children is None:
+            children = self._db_children[key] = (
+                self.db_queries_total.labels(table, operation),
+                self.db_query_duration.labels(table, operation),
+            )
         
-        self.db_query_duration.labels(
-            table=table,
-            operation=operation
-        ).observe(duration)
+        queries_total, query_duration = children
+        queries_total.inc()
+        query_duration.observe(duration)
     
-    def update_system_metrics(self):
-        """Atualiza métricas do sistema"""
-
-        cpu_percent = psutil.cpu_percent(interval=1)
+    def update_system_metrics(self, cpu_percent: float, memory_used: int, disk_percent: float):
+        """Atualiza métricas do sistema (chamado pelo SystemSampler a cada amostra)"""
         self.system_cpu_usage.set(cpu_percent)
-        
-        memory = psutil.virtual_memory()
-        self.system_memory_usage.set(memory.used)
-
-        disk = psutil.disk_usage('/')
-        disk_percent = (disk.used / disk.total) * 100
+        self.system_memory_usage.set(memory_used)
         self.system_disk_usage.set(disk_percent)
     
+    def record_books_scraped(self, count: int):
+        """Registra `count` livros raspados num único incremento"""
+        self.books_scraped_total.inc(count)
+    
     def record_business_event(self, event_type: str, **labels):
         """Registra eventos de negócio"""
         if event_type == "book_scraped":
@@ -147,50 +171,26 @@ class MetricsCollector:
             status = labels.get("status", "unknown")
             self.user_logins_total.labels(status=status).inc()
     
-    def get_metrics(self) -> str:
-        """Retorna métricas no formato Prometheus"""
-        self.update_system_metrics()
-
-        raw_metrics = generate_latest(self.registry).decode('utf-8')
-        # formatted_metrics = self._format_metrics_with_breaks(raw_metrics)
-        formatted_metrics = self._format_metrics_by_category(raw_metrics)
-
-        return formatted_metrics
-
-    # def _format_metrics_with_breaks(self, raw_metrics: str) -> str:
-    #     """Formatar métricas com quebras de linha entre seções"""
-    #     lines = raw_metrics.strip().split('\n')
-    #     formatted_lines = []
-
-    #     previous_metric_name = None
-
-    #     for line in lines:
-    #         if not line.strip():
-    #             continue
-
-    #         if line.startswith('# HELP'):
-    #             metric_name = line.split()[2]
-    #             if previous_metric_name and previous_metric_name != metric_name:
-    #                 formatted_lines.append('')
-
-    #             previous_metric_name = metric_name
-
-    #         formatted_lines.append(line)
-
-    #     return '\n'.join(formatted_lines) + '\n'
+    def get_metrics(self) -> bytes:
+        """Retorna métricas no formato de exposição do Prometheus (bytes, sem formatação)"""
+        generated_at, cached = self._cache
+        now = time.monotonic()
+        if now - generated_at < METRICS_CACHE_TTL:
+            return cached
+
+        # Gauges de sistema já vêm atualizados pelo SystemSampler: nada bloqueia aqui
+        raw_metrics = generate_latest(self.registry)
+        self._cache = (now, raw_metrics)
+        return raw_metrics
+
+    def get_pretty_metrics(self) -> str:
+        """Retorna as métricas agrupadas por categoria, para leitura humana"""
+        return self._format_metrics_by_category(self.get_metrics().decode('utf-8'))
 
     def _format_metrics_by_category(self, raw_metrics: str) -> str:
         """Organizar métricas por categoria com separadores visuais"""
         lines = raw_metrics.strip().split('\n')
-    
-        categories = {
-            'http_': 'HTTP METRICS',
-            'system_': 'SYSTEM METRICS', 
-            'db_': 'DATABASE METRICS',
-            'books_': 'BUSINESS METRICS (Books)',
-            'ml_': 'MACHINE LEARNING METRICS',
-            'user_': 'USER METRICS'
-        }
+        categories = METRIC_CATEGORIES
 
         categorized_metrics = {}
         current_section = 'other'
@@ -220,9 +220,7 @@ class MetricsCollector:
         result.append("# =" * 40)
         result.append("")
 
-        section_order = ['http_', 'system_', 'db_', 'books_', 'ml_', 'user_', 'other']
-
-        for section in section_order:
+        for section in SECTION_ORDER:
             if section in categorized_metrics and categorized_metrics[section]:
                 if section in categories:
                     result.append(f"# {'-' * 50}")
@@ -1,19 +1,45 @@
 from datetime import datetime
+import random
+import re
 import time
 import uuid
 import asyncio
-from functools import wraps
+from functools import lru_cache, wraps
 from typing import Callable, Optional
-from fastapi import Request, Response
-from fastapi.routing import APIRoute
+from fastapi import Request
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import Response as StarletteResponse
-import json
 
 from .logger import structured_logger
 from .metrics import metrics
 from .config import MonitoringConfig
 
+# Segmentos numéricos ou UUIDs viram {id}: evita uma série do Prometheus por recurso
+_ID_RE = re.compile(
+    r'/(\d+|[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12})(?=/|$)'
+)
+
+
+@lru_cache(maxsize=4096)
+def _normalize(path: str) -> str:
+    """Substitui ids do path por {id}; memoizado, pois as mesmas rotas se repetem a cada requisição"""
+    return _ID_RE.sub('/{id}', path)
+
+# (segundo, ISO) do último timestamp gerado: eventos no mesmo segundo reaproveitam a string
+_iso_now_cache = (0, "")
+
+
+def _iso_now() -> str:
+    """Timestamp UTC em ISO com resolução de segundos, gerado uma vez por segundo"""
+    global _iso_now_cache
+    second = int(time.time())
+    cached_second, iso = _iso_now_cache
+    if second != cached_second:
+        iso = datetime.utcfromtimestamp(second).isoformat()
+        _iso_now_cache = (second, iso)
+    return iso
+
+
 class RequestMonitoringMiddleware(BaseHTTPMiddleware):
     """Middleware para monitoramento automático de todas as requisições"""
     
@@ -25,7 +51,8 @@ class RequestMonitoringMiddleware(BaseHTTPMiddleware):
         request_id = str(uuid.uuid4())
         request.state.request_id = request_id
         
-        start_time = time.time()
+        # Relógio monotônico: barato e imune a ajustes do relógio de parede
+        start_time = time.perf_counter()
         method = request.method
         path = request.url.path
         user_agent = request.headers.get("user-agent", "")
@@ -35,7 +62,8 @@ class RequestMonitoringMiddleware(BaseHTTPMiddleware):
         
         request_body = None
         if (self.config.ENABLE_REQUEST_BODY_LOGGING and 
-            method in ['POST', 'PUT', 'PATCH']):
+            method in ['POST', 'PUT', 'PATCH'] and
+            random.random() < self.config.REQUEST_BODY_SAMPLE_RATE):
             request_body = await self._get_request_body(request)
 
         status_code = 500
@@ -55,7 +83,9 @@ class RequestMonitoringMiddleware(BaseHTTPMiddleware):
                 raise
             
             finally:
-                duration = time.time() - start_time
+                duration = time.perf_counter() - start_time
+                # Calculado uma vez: usado no log e no header X-Response-Time
+                duration_ms = round(duration * 1000, 2)
     
                 metrics.record_http_request(
                     method=method,
@@ -69,6 +99,7 @@ class RequestMonitoringMiddleware(BaseHTTPMiddleware):
                     path=path,
                     status_code=status_code,
                     duration=duration,
+                    duration_ms=duration_ms,
                     user_id=user_id,
                     request_id=request_id,
                     user_agent=user_agent,
@@ -77,7 +108,7 @@ class RequestMonitoringMiddleware(BaseHTTPMiddleware):
                 )
         
         response.headers["X-Request-ID"] = request_id
-        response.headers["X-Response-Time"] = f"{duration*1000:.2f}ms"
+        response.headers["X-Response-Time"] = f"{duration_ms:.2f}ms"
         
         return response
     
@@ -102,6 +133,11 @@ class RequestMonitoringMiddleware(BaseHTTPMiddleware):
     async def _get_request_body(self, request: Request) -> Optional[str]:
         """Extrai o body da requisição para logging"""
         try:
+            # Content-Length acima do limite: nem lê o body (evita bufferizar uploads grandes)
+            content_length = request.headers.get("content-length")
+            if content_length and int(content_length) > self.config.MAX_REQUEST_BODY_SIZE:
+                return None
+            # O BaseHTTPMiddleware guarda o body lido e o repassa ao handler, sem nova leitura
             body = await request.body()
             if len(body) <= self.config.MAX_REQUEST_BODY_SIZE:
                 return body.decode('utf-8')[:self.config.MAX_REQUEST_BODY_SIZE]
@@ -111,9 +147,7 @@ class RequestMonitoringMiddleware(BaseHTTPMiddleware):
     
     def _normalize_path(self, path: str) -> str:
         """Normaliza paths com parâmetros para métricas"""
-        import re
-        normalized = re.sub(r'/\d+', '/{id}', path)
-        return normalized
+        return _normalize(path)
 
 
 class DatabaseMonitoringMixin:
@@ -125,12 +159,12 @@ class DatabaseMonitoringMixin:
         def decorator(func):
             @wraps(func)
             async def async_wrapper(*args, **kwargs):
-                start_time = time.time()
+                start_time = time.perf_counter()
                 try:
                     result = await func(*args, **kwargs)
                     return result
                 finally:
-                    duration = time.time() - start_time
+                    duration = time.perf_counter() - start_time
                     metrics.record_db_query(table, operation, duration)
                     structured_logger.log_database_query(
                         query=f"{operation} on {table}",
@@ -141,12 +175,12 @@ class DatabaseMonitoringMixin:
             
             @wraps(func)
             def sync_wrapper(*args, **kwargs):
-                start_time = time.time()
+                start_time = time.perf_counter()
                 try:
                     result = func(*args, **kwargs)
                     return result
                 finally:
-                    duration = time.time() - start_time
+                    duration = time.perf_counter() - start_time
                     metrics.record_db_query(table, operation, duration)
                     structured_logger.log_database_query(
                         query=f"{operation} on {table}",
@@ -165,8 +199,7 @@ class BusinessEventTracker:
     @staticmethod
     def track_book_scraping(books_count: int):
         """Rastreia evento de scraping de livros"""
-        for _ in range(books_count):
-            metrics.record_business_event("book_scraped")
+        metrics.record_books_scraped(books_count)
         
         structured_logger.log_business_event(
             event_name="books_scraped",
@@ -202,18 +235,24 @@ class BusinessEventTracker:
     @staticmethod
     def track_scraping_start():
         """Rastreia início do scraping"""
+        if not structured_logger.is_enabled("INFO"):
+            return
         structured_logger.log_business_event(
             event_name="scraping_started",
             context={
                 "source": "books.toscrape.com",
-                "start_time": datetime.utcnow().isoformat()
+                "start_time": _iso_now()
             }
         )
 
     @staticmethod
     def track_scraping_progress(page_number: int, books_found: int, total_pages: Optional[int] = None):
         """Rastreia progresso do scraping página por página"""
+        metrics.record_business_event("page_scraped")
         
+        # Contexto só é montado se o evento for de fato logado
+        if not structured_logger.is_enabled("INFO"):
+            return
         structured_logger.log_business_event(
             event_name="scraping_page_completed",
             context={
@@ -224,18 +263,18 @@ class BusinessEventTracker:
             }
         )
 
-        metrics.record_business_event("page_scraped")
-
     @staticmethod
     def track_scraping_complete(total_books: int, duration_seconds: float):
         """Rastreia finalização do scraping"""
+        if not structured_logger.is_enabled("INFO"):
+            return
         structured_logger.log_business_event(
             event_name="scraping_completed",
             context={
                 "total_books": total_books,
                 "duration_seconds": duration_seconds,
-                "books_per_second": round(total_books / duration_seconds, 2),
-                "end_time": datetime.utcnow().isoformat()
+                "books_per_second": round(total_books / duration_seconds, 2) if duration_seconds else None,
+                "end_time": _iso_now()
             }
         )
     
\ No newline at end of file
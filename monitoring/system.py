@@ -0,0 +1,71 @@
+import psutil
+from datetime import datetime
+from threading import Event, Lock, Thread
+from typing import Dict, Any, Optional
+from .metrics import metrics
+
+
+class SystemSampler:
+    """Amostra CPU, memória e disco numa thread em background e publica nos gauges do Prometheus"""
+
+    def __init__(self, interval: float = 5.0):
+        self.interval = interval
+        self._lock = Lock()
+        self._snapshot: Dict[str, Any] = {}
+        self._stop = Event()
+        self._thread: Optional[Thread] = None
+
+    def start(self):
+        """Inicia a thread de amostragem (idempotente)"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = Thread(target=self._run, name="system-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Sinaliza a thread para parar e aguarda o fim"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval)
+            self._thread = None
+
+    def _run(self):
+        # Primeira leitura bloqueia 1s para ter uma janela de CPU válida;
+        # as seguintes medem o uso desde a amostra anterior
+        self.sample(cpu_interval=1)
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def sample(self, cpu_interval: Optional[float] = None) -> Dict[str, Any]:
+        """Lê as métricas do sistema, atualiza o snapshot e os gauges"""
+        cpu_percent = psutil.cpu_percent(interval=cpu_interval)
+        memory = psutil.virtual_memory()
+        disk = psutil.disk_usage('/')
+        snapshot = {
+            "timestamp": datetime.now().isoformat(),
+            "cpu_percent": cpu_percent,
+            "memory_percent": memory.percent,
+            "disk_percent": disk.percent,
+        }
+        with self._lock:
+            self._snapshot = snapshot
+        metrics.update_system_metrics(cpu_percent, memory.used, (disk.used / disk.total) * 100)
+        return snapshot
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Última amostra; valores None até a thread concluir a primeira leitura"""
+        with self._lock:
+            snapshot = self._snapshot
+        if snapshot:
+            return dict(snapshot)
+        # Sem amostrar no request: a leitura de CPU aqui seria 0.0 e roubaria a janela do sampler
+        return {
+            "timestamp": datetime.now().isoformat(),
+            "cpu_percent": None,
+            "memory_percent": None,
+            "disk_percent": None,
+        }
+
+
+system_sampler = SystemSampler()
@@ -1,32 +1,69 @@
 import time
 import requests
-from bs4 import BeautifulSoup
+import lxml.html
+from lxml import etree
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 from urllib.parse import urljoin
+from urllib3.util.retry import Retry
 import urllib3
 
-from monitoring.middleware import BusinessEventTracker
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 base_url= "https://books.toscrape.com/"
 
-def get_book_data(soup):
+# Categorias raspadas em paralelo; a paginação dentro de cada uma segue sequencial
+LISTING_WORKERS = 8
+
+# Timeout (s) de cada requisição: um servidor travado não prende o scraping inteiro
+REQUEST_TIMEOUT = 10
+
+# Sessão única: reaproveita conexões TCP/TLS entre todas as requisições do scraping
+session = requests.Session()
+session.verify = False
+# Um único host; o pool comporta as buscas paralelas e falhas transitórias são repetidas
+session.mount("https://", HTTPAdapter(
+    pool_connections=1,
+    pool_maxsize=32,
+    max_retries=Retry(total=3, backoff_factor=0.2, status_forcelist=[502, 503, 504]),
+))
+
+
+def _has_class(name):
+    """Predicado XPath equivalente ao seletor CSS `.name` (classe como token)"""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+# Expressões XPath compiladas uma única vez na importação (smart_strings=False devolve
+# str simples, sem manter referência à árvore inteira de cada página)
+_ARTICLE_XPATH = etree.XPath(f"//article[{_has_class('product_pod')}]")
+_TITLE_XPATH = etree.XPath("string((.//h3//a)[1]/@title)", smart_strings=False)
+_PRICE_XPATH = etree.XPath(f"string((.//*[{_has_class('price_color')}])[1])", smart_strings=False)
+_RATING_XPATH = etree.XPath(f"string((.//*[{_has_class('star-rating')}])[1]/@class)", smart_strings=False)
+_AVAILABILITY_XPATH = etree.XPath(
+    f"string((.//*[{_has_class('instock')} and {_has_class('availability')}])[1])", smart_strings=False
+)
+_IMAGE_XPATH = etree.XPath("string((.//img)[1]/@src)", smart_strings=False)
+_CATEGORY_LINKS_XPATH = etree.XPath(f"//div[{_has_class('side_categories')}]//ul//li//ul//li//a")
+_NEXT_PAGE_XPATH = etree.XPath(f"string((//li[{_has_class('next')}]//a)[1]/@href)", smart_strings=False)
+
+
+def parse_html(text):
+    """Monta a árvore lxml de uma página"""
+    return lxml.html.fromstring(text)
+
+
+def get_book_data(tree, category):
+    """Extrai os livros de uma página de listagem de `category`"""
     books = []
     
-    for article in soup.select("article.product_pod"):
-        title = article.h3.a["title"]
-        price = article.select_one(".price_color").text
-        rating_class = article.select_one(".star-rating")["class"][-1]
-        availability = article.select_one(".instock.availability").text.strip()
-        detail_href = article.h3.a["href"]
-        detail_url = urljoin(base_url + "catalogue/", detail_href)
-
-
-        # Get category from detail page
-        detail_response = requests.get(detail_url, verify=False)
-        detail_soup = BeautifulSoup(detail_response.text,"html.parser")
-        category = detail_soup.select_one("ul.breadcrumb li:nth-of-type(3) a").text
+    for article in _ARTICLE_XPATH(tree):
+        title = _TITLE_XPATH(article)
+        price = _PRICE_XPATH(article)
+        rating_class = _RATING_XPATH(article).split()[-1]
+        availability = _AVAILABILITY_XPATH(article).strip()
         
-        image_relative = article.img["src"]
+        image_relative = _IMAGE_XPATH(article)
         image_url = urljoin(base_url, image_relative)
 
 
@@ -41,6 +78,43 @@ def get_book_data(soup):
 
     return books
 
+
+def get_category_urls(tree):
+    """Lista (categoria, url) a partir do menu lateral de uma página de listagem"""
+    return [
+        (link.text_content().strip(), urljoin(base_url, link.get("href")))
+        for link in _CATEGORY_LINKS_XPATH(tree)
+    ]
+
+
+def scrape_category(category, page_url):
+    """Percorre a paginação de uma categoria, retornando os livros de cada página"""
+    pages = []
+    while True:
+        print(f"Scraping {page_url}")
+        response = session.get(page_url, timeout=REQUEST_TIMEOUT)
+        tree = parse_html(response.text)
+        pages.append(get_book_data(tree, category))
+
+        next_href = _NEXT_PAGE_XPATH(tree)
+        if not next_href:
+            return pages
+        page_url = urljoin(page_url, next_href)
+
+
+def iter_category_pages():
+    """Percorre as listagens por categoria, produzindo os livros de cada página.
+
+    A categoria vem do menu lateral, evitando uma requisição por livro à página de detalhe.
+    As categorias são raspadas em paralelo e entregues na ordem do menu.
+    """
+    response = session.get(base_url, timeout=REQUEST_TIMEOUT)
+    categories = get_category_urls(parse_html(response.text))
+    with ThreadPoolExecutor(max_workers=LISTING_WORKERS) as executor:
+        futures = [executor.submit(scrape_category, category, page_url) for category, page_url in categories]
+        for future in futures:
+            yield from future.result()
+
 def scrape_all_books():
 
     try:
@@ -59,32 +133,17 @@ def scrape_all_books():
                 print(f"Scraping completed: {total} books in {duration:.2f}s")
     
     all_books = []
-    page_url = base_url + "catalogue/page-1.html"
-    page_number = 1
 
     BusinessEventTracker.track_scraping_start()
     start_time = time.time()
 
-    while True:
-        print(f"Scraping {page_url}")
-        response = requests.get(page_url, verify=False)
-        soup = BeautifulSoup(response.text, "html.parser")
-        books = get_book_data(soup)
+    for page_number, books in enumerate(iter_category_pages(), start=1):
         all_books.extend(books)
 
         BusinessEventTracker.track_scraping_progress(
             page_number=page_number,
-            books_found=len(books),
-            total_pages=50
+            books_found=len(books)
         )
-
-        next_button = soup.select_one("li.next a")
-        if next_button:
-            next_href = next_button["href"]
-            page_url = urljoin(page_url, next_href)
-            page_number += 1
-        else:
-            break
     
     duration = time.time() - start_time
     BusinessEventTracker.track_scraping_complete(
@@ -94,8 +153,8 @@ def scrape_all_books():
 
     return all_books
 
-def scrape_all_books_with_progress(callback_func=None):
-    """Scraping com callback para atualizar progresso em tempo real"""
+def iter_books_with_progress(callback_func=None):
+    """Gera os livros à medida que as páginas são raspadas, com callback de progresso"""
     
     try:
         from monitoring import BusinessEventTracker
@@ -111,56 +170,43 @@ def scrape_all_books_with_progress(callback_func=None):
             def track_scraping_complete(*args):
                 pass
     
-    all_books = []
-    page_url = base_url + "catalogue/page-1.html"
-    page_number = 1
+    total_books = 0
     
     BusinessEventTracker.track_scraping_start()
     start_time = time.time()
     
-    while True:
-        print(f"Scraping {page_url}")
-        response = requests.get(page_url, verify=False)
-        soup = BeautifulSoup(response.text, "html.parser")
-        books = get_book_data(soup)
-        all_books.extend(books)
+    for page_number, books in enumerate(iter_category_pages(), start=1):
+        total_books += len(books)
         
         if callback_func:
-            callback_func(page_number, len(books), len(all_books))
+            callback_func(page_number, len(books), total_books)
         
         BusinessEventTracker.track_scraping_progress(
             page_number=page_number,
-            books_found=len(books),
-            total_pages=50
+            books_found=len(books)
         )
         
-        next_button = soup.select_one("li.next a")
-        if next_button:
-            next_href = next_button["href"]
-            page_url = urljoin(page_url, next_href)
-            page_number += 1
-        else:
-            break
+        yield from books
     
     duration = time.time() - start_time
     BusinessEventTracker.track_scraping_complete(
-        total_books=len(all_books),
+        total_books=total_books,
         duration_seconds=duration
     )
-    
-    return all_books
+
+def scrape_all_books_with_progress(callback_func=None):
+    """Scraping com callback para atualizar progresso em tempo real"""
+    return list(iter_books_with_progress(callback_func))
 
 def save_to_csv(books, filename):
+    """Grava os livros em CSV; aceita qualquer iterável, inclusive o gerador do scraping"""
     import csv
-    with open(filename, mode="w", newline="", encoding="utf-8") as file:
+    from operator import itemgetter
+
+    # Projeção das colunas feita em C (itemgetter) e um único writerows
+    row = itemgetter("title", "price", "rating", "availability", "category", "image_url")
+    # Buffer de 1 MiB: menos syscalls de escrita
+    with open(filename, mode="w", newline="", encoding="utf-8", buffering=1024 * 1024) as file:
         writer = csv.writer(file)
         writer.writerow(["Title", "Price", "Rating", "Availability", "Category", "Image URL"])
-        for book in books:
-            writer.writerow([
-                book["title"],
-                book["price"],
-                book["rating"],
-                book["availability"],
-                book["category"],
-                book["image_url"]
-            ])
+        writer.writerows(map(row, books))